@@ -1,10 +1,13 @@
 """Universalis 和 XIVAPI 的 API 呼叫函數."""
 
 import asyncio
+import functools
 import re
+import time
 from typing import Optional
 
 import aiohttp
+import orjson
 import requests
 from opencc import OpenCC
 
@@ -25,6 +28,36 @@ from .config import (
 )
 
 
+def _ttl_cache(ttl: float):
+    """為函數結果加上 TTL 快取裝飾器.
+
+    只快取非空結果，請求失敗時下次呼叫會重新嘗試。
+
+    Args:
+        ttl: 快取有效秒數
+    """
+    def decorator(func):
+        cache: dict = {}
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            key = (args, tuple(sorted(kwargs.items())))
+            now = time.monotonic()
+            hit = cache.get(key)
+            if hit and now - hit[0] < ttl:
+                return hit[1]
+
+            value = func(*args, **kwargs)
+            if value:
+                cache[key] = (now, value)
+            return value
+
+        wrapper.cache_clear = cache.clear
+        return wrapper
+
+    return decorator
+
+
 def _extract_item_id(query: str) -> int:
     """從查詢字串中提取物品 ID.
 
@@ -99,7 +132,7 @@ def search_items(query: str, limit: int = 20, category: int = 0, page: int = 1)
 
         response = requests.get(url, params=params, timeout=API_TIMEOUT)
         if response.status_code == 200:
-            data = response.json()
+            data = orjson.loads(response.content)
 
             # 取得分頁資訊
             pag_info = data.get("Pagination", {})
@@ -119,7 +152,7 @@ def search_items(query: str, limit: int = 20, category: int = 0, page: int = 1)
                         "icon": "",
                         "level": item.get("LevelItem", 0),
                     })
-    except requests.RequestException as e:
+    except (requests.RequestException, orjson.JSONDecodeError) as e:
         print(f"Cafemaker 搜尋錯誤: {e}")
 
     return {"items": results, "pagination": pagination}
@@ -139,12 +172,12 @@ def get_item_info(item_id: int) -> dict:
         url = f"{CAFEMAKER_BASE}/item/{item_id}"
         response = requests.get(url, timeout=API_TIMEOUT)
         if response.status_code == 200:
-            data = response.json()
+            data = orjson.loads(response.content)
             # 將簡體名稱轉換為繁體
             if data.get("Name"):
                 data["Name"] = _s2t_converter.convert(data["Name"])
             return data
-    except requests.RequestException as e:
+    except (requests.RequestException, orjson.JSONDecodeError) as e:
         print(f"Cafemaker 取得物品資訊錯誤: {e}")
 
     # 備用：嘗試 XIVAPI
@@ -153,20 +186,27 @@ def get_item_info(item_id: int) -> dict:
         params = {"language": "en"}
         response = requests.get(url, params=params, timeout=API_TIMEOUT)
         if response.status_code == 200:
-            return response.json()
-    except requests.RequestException as e:
+            return orjson.loads(response.content)
+    except (requests.RequestException, orjson.JSONDecodeError) as e:
         print(f"XIVAPI 取得物品資訊錯誤: {e}")
 
     # 如果都失敗，返回基本資訊
     return {"ID": item_id, "Name": f"物品 {item_id}", "LevelItem": 0}
 
 
-def get_market_data(item_id: int, world_or_dc: str = None) -> dict:
+def get_market_data(
+    item_id: int,
+    world_or_dc: str = None,
+    listings: int = 50,
+    entries: int = 50,
+) -> dict:
     """取得市場板數據.
 
     Args:
         item_id: 物品 ID
         world_or_dc: 伺服器或資料中心名稱
+        listings: 返回的上架數量
+        entries: 返回的交易記錄數量
 
     Returns:
         市場數據字典
@@ -177,17 +217,18 @@ def get_market_data(item_id: int, world_or_dc: str = None) -> dict:
     try:
         url = f"{UNIVERSALIS_BASE}/{world_or_dc}/{item_id}"
         params = {
-            "listings": 50,
-            "entries": 50,
+            "listings": listings,
+            "entries": entries,
         }
         response = requests.get(url, params=params, timeout=MARKET_API_TIMEOUT)
         response.raise_for_status()
-        return response.json()
-    except requests.RequestException as e:
+        return orjson.loads(response.content)
+    except (requests.RequestException, orjson.JSONDecodeError) as e:
         print(f"取得市場數據錯誤: {e}")
         return {}
 
 
+@_ttl_cache(ttl=3600)  # 稅率每週才輪替一次
 def get_tax_rates(world: str) -> dict:
     """取得稅率資訊.
 
@@ -205,12 +246,13 @@ def get_tax_rates(world: str) -> dict:
         params = {"world": world_id}
         response = requests.get(url, params=params, timeout=API_TIMEOUT)
         response.raise_for_status()
-        return response.json()
-    except requests.RequestException as e:
+        return orjson.loads(response.content)
+    except (requests.RequestException, orjson.JSONDecodeError) as e:
         print(f"取得稅率錯誤: {e}")
         return {}
 
 
+@_ttl_cache(ttl=300)
 def get_upload_stats() -> dict:
     """取得上傳統計.
 
@@ -221,8 +263,8 @@ def get_upload_stats() -> dict:
         url = f"{UNIVERSALIS_BASE}/extra/stats/world-upload-counts"
         response = requests.get(url, timeout=API_TIMEOUT)
         response.raise_for_status()
-        return response.json()
-    except requests.RequestException as e:
+        return orjson.loads(response.content)
+    except (requests.RequestException, orjson.JSONDecodeError) as e:
         print(f"取得上傳統計錯誤: {e}")
         return {}
 
@@ -248,13 +290,14 @@ def get_recently_updated(world_or_dc: str = None, limit: int = 20) -> list:
         params = {"world": world_id} if isinstance(world_id, int) else {"dcName": world_or_dc}
         response = requests.get(url, params=params, timeout=API_TIMEOUT)
         response.raise_for_status()
-        data = response.json()
+        data = orjson.loads(response.content)
         return data.get("items", [])[:limit]
-    except requests.RequestException as e:
+    except (requests.RequestException, orjson.JSONDecodeError) as e:
         print(f"取得最近更新錯誤: {e}")
         return []
 
 
+@_ttl_cache(ttl=30)
 def get_recent_activity(world_or_dc: str = None, limit: int = 15) -> list:
     """取得市場動態（最近更新的物品及其價格資訊）.
 
@@ -296,6 +339,7 @@ def get_recent_activity(world_or_dc: str = None, limit: int = 15) -> list:
             "hq_min": min(hq_prices) if hq_prices else None,
             "listing_count": len(listings),
             "last_update": market_data.get("lastUploadTime", 0),
+            "recent_history": market_data.get("recentHistory", []),
         }
 
     # 並行請求物品資料
@@ -347,7 +391,7 @@ async def get_market_data_async(
             url, params=params, timeout=aiohttp.ClientTimeout(total=MARKET_API_TIMEOUT)
         ) as response:
             if response.status == 200:
-                return await response.json()
+                return await response.json(loads=orjson.loads)
             return {}
     except Exception as e:
         print(f"異步取得市場數據錯誤: {e}")
@@ -381,7 +425,7 @@ async def get_item_info_async(
             url, timeout=aiohttp.ClientTimeout(total=API_TIMEOUT)
         ) as response:
             if response.status == 200:
-                data = await response.json()
+                data = await response.json(loads=orjson.loads)
                 if data.get("Name"):
                     data["Name"] = _s2t_converter.convert(data["Name"])
                 return data
@@ -396,7 +440,7 @@ async def get_item_info_async(
             url, params=params, timeout=aiohttp.ClientTimeout(total=API_TIMEOUT)
         ) as response:
             if response.status == 200:
-                return await response.json()
+                return await response.json(loads=orjson.loads)
     except Exception as e:
         print(f"XIVAPI 異步取得物品資訊錯誤: {e}")
     finally:
@@ -409,12 +453,18 @@ async def get_item_info_async(
 async def get_multi_item_market_data_async(
     item_ids: list[int],
     world_or_dc: str = None,
+    listings: int = 20,
+    entries: int = 20,
+    session: aiohttp.ClientSession = None,
 ) -> dict:
     """異步批量取得多個物品的市場數據.
 
     Args:
         item_ids: 物品 ID 列表
         world_or_dc: 伺服器或資料中心名稱
+        listings: 每個物品返回的上架數量，None 表示返回全部
+        entries: 每個物品返回的交易記錄數量
+        session: 可選的 aiohttp session
 
     Returns:
         以物品 ID 為 key 的市場數據字典
@@ -428,21 +478,30 @@ async def get_multi_item_market_data_async(
     # Universalis 支援批量查詢，最多 100 個物品
     ids_str = ",".join(str(i) for i in item_ids[:100])
     url = f"{UNIVERSALIS_BASE}/{world_or_dc}/{ids_str}"
-    params = {"listings": 20, "entries": 20}
+    params = {"entries": entries}
+    if listings is not None:
+        params["listings"] = listings
+
+    close_session = False
+    if session is None:
+        session = aiohttp.ClientSession()
+        close_session = True
 
     try:
-        async with aiohttp.ClientSession() as session:
-            async with session.get(
-                url, params=params, timeout=aiohttp.ClientTimeout(total=MARKET_API_TIMEOUT)
-            ) as response:
-                if response.status == 200:
-                    data = await response.json()
-                    # 如果是單個物品，包裝成 items 格式
-                    if "items" not in data and "itemID" in data:
-                        return {data["itemID"]: data}
-                    return data.get("items", {})
+        async with session.get(
+            url, params=params, timeout=aiohttp.ClientTimeout(total=MARKET_API_TIMEOUT)
+        ) as response:
+            if response.status == 200:
+                data = await response.json(loads=orjson.loads)
+                # 如果是單個物品，包裝成 items 格式
+                if "items" not in data and "itemID" in data:
+                    return {data["itemID"]: data}
+                return data.get("items", {})
     except Exception as e:
         print(f"批量取得市場數據錯誤: {e}")
+    finally:
+        if close_session:
+            await session.close()
 
     return {}
 
@@ -499,6 +558,68 @@ def get_market_data_fast(item_id: int, world_or_dc: str = None) -> dict:
         return get_market_data(item_id, world_or_dc)
 
 
+async def _get_multi_item_market_data_chunked(
+    item_ids: list[int],
+    world_or_dc: str = None,
+    listings: int = 50,
+    entries: int = 50,
+) -> dict:
+    """分批（每批 100 個）並行異步取得多個物品的市場數據."""
+    connector = aiohttp.TCPConnector(limit=64, limit_per_host=32, ttl_dns_cache=300)
+    async with aiohttp.ClientSession(connector=connector) as session:
+        chunks = await asyncio.gather(*(
+            get_multi_item_market_data_async(
+                item_ids[start:start + 100], world_or_dc,
+                listings=listings, entries=entries, session=session,
+            )
+            for start in range(0, len(item_ids), 100)
+        ))
+
+    results = {}
+    for chunk in chunks:
+        results.update(chunk)
+    return results
+
+
+def get_multi_item_market_data_fast(
+    item_ids: list[int],
+    world_or_dc: str = None,
+    listings: int = 50,
+    entries: int = 50,
+) -> dict:
+    """快速批量取得多個物品的市場數據（使用異步）.
+
+    超過 100 個物品時會自動分批請求。
+
+    Args:
+        item_ids: 物品 ID 列表
+        world_or_dc: 伺服器或資料中心名稱
+        listings: 每個物品返回的上架數量，None 表示返回全部
+        entries: 每個物品返回的交易記錄數量
+
+    Returns:
+        以物品 ID（int）為 key 的市場數據字典
+    """
+    if not item_ids:
+        return {}
+
+    try:
+        loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(loop)
+        result = loop.run_until_complete(
+            _get_multi_item_market_data_chunked(
+                list(item_ids), world_or_dc, listings, entries
+            )
+        )
+        loop.close()
+    except Exception as e:
+        print(f"快速批量取得市場數據錯誤: {e}")
+        return {}
+
+    # JSON 物件的 key 為字串，統一轉為 int
+    return {int(k): v for k, v in result.items()}
+
+
 def get_full_item_data_fast(item_id: int, world_or_dc: str = None) -> dict:
     """快速取得物品完整資料（使用異步並行請求）.
 
@@ -541,7 +662,7 @@ def get_recipe(recipe_id: int) -> dict:
         url = f"{CAFEMAKER_BASE}/Recipe/{recipe_id}"
         response = requests.get(url, timeout=API_TIMEOUT)
         if response.status_code == 200:
-            data = response.json()
+            data = orjson.loads(response.content)
             # 轉換名稱為繁體
             if data.get("Name"):
                 data["Name"] = _s2t_converter.convert(data["Name"])
@@ -558,7 +679,7 @@ def get_recipe(recipe_id: int) -> dict:
                         data[ingredient_key]["Name"]
                     )
             return data
-    except requests.RequestException as e:
+    except (requests.RequestException, orjson.JSONDecodeError) as e:
         print(f"取得配方錯誤: {e}")
     return {}
 
@@ -588,7 +709,7 @@ def search_recipes(query: str, limit: int = 10) -> list:
         }
         response = requests.get(url, params=params, timeout=API_TIMEOUT)
         if response.status_code == 200:
-            data = response.json()
+            data = orjson.loads(response.content)
             results = []
             for item in data.get("Results", []):
                 results.append({
@@ -597,7 +718,7 @@ def search_recipes(query: str, limit: int = 10) -> list:
                     "icon": item.get("Icon", ""),
                 })
             return results
-    except requests.RequestException as e:
+    except (requests.RequestException, orjson.JSONDecodeError) as e:
         print(f"搜尋配方錯誤: {e}")
     return []
 
@@ -662,7 +783,7 @@ async def get_recipe_async(
             url, timeout=aiohttp.ClientTimeout(total=API_TIMEOUT)
         ) as response:
             if response.status == 200:
-                data = await response.json()
+                data = await response.json(loads=orjson.loads)
                 # 轉換名稱為繁體
                 if data.get("Name"):
                     data["Name"] = _s2t_converter.convert(data["Name"])
@@ -12,6 +12,9 @@ from .api import get_market_data
 from .config import WORLD_NAMES
 from .utils import format_relative_time
 
+# 伺服器排序用（避免 list.index 的線性搜尋）
+_WORLD_RANK = {world: i for i, world in enumerate(WORLD_NAMES)}
+
 # 美化的圖表配色方案
 CHART_COLORS = {
     "nq": "#8b9dc3",      # 柔和的藍灰色
@@ -289,7 +292,7 @@ def create_cross_world_comparison(
                 comparison_data.append(result)
 
     # 按伺服器名稱排序
-    comparison_data.sort(key=lambda x: WORLD_NAMES.index(x["伺服器"]))
+    comparison_data.sort(key=lambda x: _WORLD_RANK[x["伺服器"]])
 
     df = pd.DataFrame(comparison_data)
 
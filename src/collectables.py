@@ -4,12 +4,12 @@
 資料來源：FFXIV Teamcraft (https://github.com/ffxiv-teamcraft/ffxiv-teamcraft)
 """
 
-import json
 import os
 import time
 from pathlib import Path
 from typing import Optional
 
+import orjson
 import requests
 from opencc import OpenCC
 
@@ -518,9 +518,9 @@ def _download_json(url: str, cache_name: str) -> dict:
     # 檢查快取
     if _is_cache_valid(cache_path):
         try:
-            with open(cache_path, "r", encoding="utf-8") as f:
-                return json.load(f)
-        except (json.JSONDecodeError, IOError):
+            with open(cache_path, "rb") as f:
+                return orjson.loads(f.read())
+        except (orjson.JSONDecodeError, IOError):
             pass  # 快取損壞，重新下載
 
     # 下載資料
@@ -528,21 +528,21 @@ def _download_json(url: str, cache_name: str) -> dict:
         print(f"下載資料: {cache_name}...")
         response = requests.get(url, timeout=30)
         response.raise_for_status()
-        data = response.json()
+        data = orjson.loads(response.content)
 
-        # 儲存快取
-        with open(cache_path, "w", encoding="utf-8") as f:
-            json.dump(data, f, ensure_ascii=False)
+        # 儲存快取（直接寫入原始回應內容，一次寫入）
+        with open(cache_path, "wb") as f:
+            f.write(response.content)
 
         return data
-    except requests.RequestException as e:
+    except (requests.RequestException, orjson.JSONDecodeError) as e:
         print(f"下載失敗 {cache_name}: {e}")
         # 嘗試使用過期的快取
         if cache_path.exists():
             try:
-                with open(cache_path, "r", encoding="utf-8") as f:
-                    return json.load(f)
-            except (json.JSONDecodeError, IOError):
+                with open(cache_path, "rb") as f:
+                    return orjson.loads(f.read())
+            except (orjson.JSONDecodeError, IOError):
                 pass
         return {}
 
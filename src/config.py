@@ -55,6 +55,27 @@ POPULAR_ITEMS = {
     "水之水晶 / Water Crystal": 13,
 }
 
+# 製作職業 ClassJob ID 對應表
+CRAFT_JOB_NAMES = {
+    8: "刻木匠", 9: "鍛鐵匠", 10: "鑄甲匠", 11: "雕金匠",
+    12: "製革匠", 13: "裁縫師", 14: "煉金術士", 15: "烹調師",
+}
+
+# 職業縮寫對應表
+JOB_ABBR_NAMES = {
+    "PLD": "騎士", "WAR": "戰士", "DRK": "暗黑騎士", "GNB": "絕槍戰士",
+    "WHM": "白魔法師", "SCH": "學者", "AST": "占星術士", "SGE": "賢者",
+    "MNK": "武僧", "DRG": "龍騎士", "NIN": "忍者", "SAM": "武士", "RPR": "鐮刀師", "VPR": "蝰蛇劍士",
+    "BRD": "吟遊詩人", "MCH": "機工士", "DNC": "舞者",
+    "BLM": "黑魔法師", "SMN": "召喚師", "RDM": "赤魔法師", "PCT": "繪靈法師",
+    "PGL": "格鬥家", "GLA": "劍術師", "MRD": "斧術師", "LNC": "槍術師",
+    "ARC": "弓箭手", "ROG": "雙劍師", "THM": "咒術師", "ACN": "秘術師", "CNJ": "幻術師",
+    "CRP": "刻木匠", "BSM": "鍛鐵匠", "ARM": "鑄甲匠", "GSM": "雕金匠",
+    "LTW": "製革匠", "WVR": "裁縫師", "ALC": "煉金術士", "CUL": "烹調師",
+    "MIN": "採礦工", "BTN": "園藝工", "FSH": "捕魚人",
+    "BLU": "青魔法師",
+}
+
 # API 請求超時時間（秒）
 API_TIMEOUT = 10
 MARKET_API_TIMEOUT = 15
@@ -11,12 +11,14 @@
 
 import asyncio
 from concurrent.futures import ThreadPoolExecutor, as_completed
-from typing import Optional
+from typing import Iterator, Optional
+
+import numpy as np
 
 from .api import (
     get_item_info,
     get_market_data,
-    get_multi_item_market_data_async,
+    get_multi_item_market_data_fast,
     get_recent_activity,
     get_recipe,
     get_recipe_by_item_id,
@@ -40,6 +42,9 @@ CRAFT_TYPES = {
 # 預設使用 3%（中等等級雇員）
 DEFAULT_TAX_RATE = 0.03
 
+# 材料單價不高於此值時不遞迴計算製作成本（省下的成本不值得額外的 API 請求）
+RECURSIVE_MIN_PRICE = 100
+
 # 配方快取（配方資料不常變動）
 _recipe_cache: dict = {}
 
@@ -88,7 +93,11 @@ def get_vendor_price(item_id: int) -> int:
     return vendor_price if vendor_price and vendor_price > 0 else 0
 
 
-def get_lowest_price(item_id: int, world_or_dc: str = None) -> tuple[int, int, int]:
+def get_lowest_price(
+    item_id: int,
+    world_or_dc: str = None,
+    _market_cache: dict = None,
+) -> tuple[int, int, int]:
     """取得物品的最低價格（包含 Vendor 價格）.
 
     參考 GilGoblin 的做法：取 min(Vendor, Market Board)
@@ -96,6 +105,7 @@ def get_lowest_price(item_id: int, world_or_dc: str = None) -> tuple[int, int, i
     Args:
         item_id: 物品 ID
         world_or_dc: 伺服器或資料中心
+        _market_cache: 預先批量取得的市場數據 {item_id: market_data}（內部使用）
 
     Returns:
         (NQ 最低價, HQ 最低價, Vendor 價格)
@@ -106,8 +116,11 @@ def get_lowest_price(item_id: int, world_or_dc: str = None) -> tuple[int, int, i
     # 取得 Vendor 價格
     vendor_price = get_vendor_price(item_id)
 
-    # 取得市場價格
-    market_data = get_market_data(item_id, world_or_dc)
+    # 取得市場價格（優先使用預取的市場數據）
+    if _market_cache is not None and item_id in _market_cache:
+        market_data = _market_cache[item_id]
+    else:
+        market_data = get_market_data(item_id, world_or_dc)
     if not market_data:
         return (vendor_price, 0, vendor_price)
 
@@ -132,6 +145,8 @@ def calculate_crafting_cost(
     max_depth: int = 3,
     tax_rate: float = DEFAULT_TAX_RATE,
     _depth: int = 0,
+    _market_cache: dict = None,
+    _prefetched_price: tuple[int, int, int] = None,
 ) -> dict:
     """計算製作成本與利潤.
 
@@ -146,6 +161,8 @@ def calculate_crafting_cost(
         max_depth: 最大遞迴深度
         tax_rate: 市場稅率（預設 3%）
         _depth: 當前遞迴深度（內部使用）
+        _market_cache: 預先批量取得的市場數據 {item_id: market_data}（內部使用）
+        _prefetched_price: 上層遞迴已取得的本物品 get_lowest_price 結果（內部使用）
 
     Returns:
         {
@@ -198,16 +215,16 @@ def calculate_crafting_cost(
     # 取得材料
     materials = get_materials_from_recipe(recipe)
 
-    # 計算材料成本
-    material_costs = []
-    total_craft_cost = 0
-
-    for material in materials:
-        mat_id = material["id"]
-        mat_quantity = material["quantity"]
+    # 計算材料成本（各欄位分開存放，最後再組合成輸出格式）
+    mat_ids = [m["id"] for m in materials]
+    unit_prices = []
+    methods = []
 
+    for mat_id in mat_ids:
         # 取得材料價格（包含 Vendor）
-        nq_price, hq_price, vendor_price = get_lowest_price(mat_id, world_or_dc)
+        nq_price, hq_price, vendor_price = get_lowest_price(
+            mat_id, world_or_dc, _market_cache=_market_cache
+        )
 
         # 決定最佳取得方式（參考 GilGoblin）
         method = "buy"
@@ -219,13 +236,20 @@ def calculate_crafting_cost(
             method = "vendor"
 
         # 遞迴計算：檢查自己製作是否更便宜
-        if recursive and _depth < max_depth and best_price > 0:
+        # NPC 商店價格已接近底價，低價材料也不值得再查配方
+        if (
+            recursive
+            and _depth < max_depth
+            and method != "vendor"
+            and best_price > RECURSIVE_MIN_PRICE
+        ):
             mat_recipe = get_recipe_by_item_id(mat_id)
             if mat_recipe:
                 mat_craft = calculate_crafting_cost(
                     mat_id, world_or_dc, recursive=True,
                     max_depth=max_depth, tax_rate=tax_rate,
-                    _depth=_depth + 1
+                    _depth=_depth + 1, _market_cache=_market_cache,
+                    _prefetched_price=(nq_price, hq_price, vendor_price),
                 )
                 if not mat_craft.get("error"):
                     craft_price = mat_craft.get("craft_cost", 0)
@@ -233,20 +257,34 @@ def calculate_crafting_cost(
                         best_price = craft_price
                         method = "craft"
 
-        total_price = best_price * mat_quantity
-        total_craft_cost += total_price
+        unit_prices.append(best_price)
+        methods.append(method)
 
-        material_costs.append({
+    quantities = np.array([m["quantity"] for m in materials], dtype=np.int64)
+    totals = np.array(unit_prices, dtype=np.int64) * quantities
+    total_craft_cost = int(totals.sum())
+
+    material_costs = [
+        {
             "id": mat_id,
             "name": material["name"],
-            "quantity": mat_quantity,
-            "unit_price": best_price,
-            "total_price": total_price,
+            "quantity": material["quantity"],
+            "unit_price": unit_price,
+            "total_price": int(total_price),
             "method": method,
-        })
+        }
+        for mat_id, material, unit_price, total_price, method in zip(
+            mat_ids, materials, unit_prices, totals, methods
+        )
+    ]
 
-    # 取得產出物市場價
-    market_nq, market_hq, _ = get_lowest_price(item_id, world_or_dc)
+    # 取得產出物市場價（遞迴呼叫時上層已查過，直接沿用）
+    if _prefetched_price is not None:
+        market_nq, market_hq, _ = _prefetched_price
+    else:
+        market_nq, market_hq, _ = get_lowest_price(
+            item_id, world_or_dc, _market_cache=_market_cache
+        )
 
     # 計算稅金和實際收入
     tax_nq = int(market_nq * tax_rate) if market_nq > 0 else 0
@@ -319,10 +357,8 @@ def get_profitable_items(
     # 取得最近交易的物品
     recent_items = get_recent_activity(world_or_dc, limit=50)
 
-    results = []
-
-    def process_item(item: dict) -> Optional[dict]:
-        """處理單一物品."""
+    def fetch_recipe(item: dict) -> Optional[tuple[int, dict]]:
+        """取得單一物品的配方並進行職業篩選."""
         item_id = item.get("id")
         if not item_id:
             return None
@@ -338,9 +374,34 @@ def get_profitable_items(
             if recipe_craft_type != craft_type:
                 return None
 
+        return item_id, recipe
+
+    # 並行取得配方
+    craftable = []
+    with ThreadPoolExecutor(max_workers=5) as executor:
+        futures = [executor.submit(fetch_recipe, item) for item in recent_items]
+        for future in as_completed(futures):
+            result = future.result()
+            if result:
+                craftable.append(result)
+
+    if not craftable:
+        return []
+
+    # 收集所有成品與材料 ID，一次批量取得市場數據（材料常在多個配方間重複）
+    all_ids = set()
+    for item_id, recipe in craftable:
+        all_ids.add(item_id)
+        all_ids.update(m["id"] for m in get_materials_from_recipe(recipe))
+    market_cache = get_multi_item_market_data_fast(sorted(all_ids), world_or_dc)
+
+    results = []
+
+    def process_item(item_id: int) -> Optional[dict]:
+        """計算單一物品的利潤."""
         # 計算利潤（不遞迴，加快速度）
         profit_data = calculate_crafting_cost(
-            item_id, world_or_dc, recursive=False
+            item_id, world_or_dc, recursive=False, _market_cache=market_cache
         )
 
         if profit_data.get("error"):
@@ -354,7 +415,7 @@ def get_profitable_items(
 
     # 並行處理
     with ThreadPoolExecutor(max_workers=5) as executor:
-        futures = {executor.submit(process_item, item): item for item in recent_items}
+        futures = [executor.submit(process_item, item_id) for item_id, _ in craftable]
         for future in as_completed(futures):
             result = future.result()
             if result:
@@ -384,8 +445,21 @@ def format_crafting_result(result: dict) -> str:
     Returns:
         Markdown 格式的字串
     """
+    return "".join(iter_crafting_result(result))
+
+
+def iter_crafting_result(result: dict) -> Iterator[str]:
+    """逐段產生製作利潤結果的 Markdown（標題、每列材料、成本分析）.
+
+    Args:
+        result: calculate_crafting_cost 的返回值
+
+    Yields:
+        Markdown 片段
+    """
     if result.get("error"):
-        return f"**{result['error']}**"
+        yield f"**{result['error']}**"
+        return
 
     # 推薦圖示
     profit_rate = max(result.get("profit_rate_nq", 0), result.get("profit_rate_hq", 0))
@@ -405,7 +479,7 @@ def format_crafting_result(result: dict) -> str:
         "craft": "製作",
     }
 
-    output = f"""## {icon} {result['item_name']}
+    yield f"""## {icon} {result['item_name']}
 
 **職業:** {result['craft_type']}
 
@@ -415,13 +489,14 @@ def format_crafting_result(result: dict) -> str:
 |------|------|------|------|------|
 """
 
+    get_method = method_icons.get
     for mat in result.get("materials", []):
-        method_text = method_icons.get(mat["method"], mat["method"])
-        output += f"| {mat['name']} | {mat['quantity']} | {format_price(mat['unit_price'])} | {format_price(mat['total_price'])} | {method_text} |\n"
+        method_text = get_method(mat["method"], mat["method"])
+        yield f"| {mat['name']} | {mat['quantity']} | {format_price(mat['unit_price'])} | {format_price(mat['total_price'])} | {method_text} |\n"
 
     tax_rate_pct = result.get('tax_rate', 0.03) * 100
 
-    output += f"""
+    yield f"""
 ### 成本與收益分析
 
 | 項目 | NQ | HQ |
@@ -438,5 +513,3 @@ def format_crafting_result(result: dict) -> str:
 ---
 <small>計算公式參考 [FFXIVMB](https://www.ffxivmb.com/Recipes) / [FFXIV Tools](https://ffxiv.itinerare.net/crafting) | 材料來源: NPC=商店購買, MB=市場板, 製作=自己做更便宜</small>
 """
-
-    return output
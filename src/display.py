@@ -1,9 +1,10 @@
 """顯示邏輯函數."""
 
-from concurrent.futures import ThreadPoolExecutor
-from typing import Optional, Tuple
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Tuple
 
 import gradio as gr
+import numpy as np
 import pandas as pd
 import plotly.graph_objects as go
 
@@ -25,18 +26,33 @@ from .charts import (
     create_upload_stats_chart,
 )
 from .config import (
+    CRAFT_JOB_NAMES,
     DATA_CENTER,
+    JOB_ABBR_NAMES,
     POPULAR_ITEMS,
     WORLD_NAMES,
-    WORLDS,
 )
 from .utils import (
     format_price,
+    format_prices_vec,
     format_relative_time,
+    format_relative_time_ts,
     process_history,
     process_listings,
 )
 
+# 稅率表欄位（顯示名稱, API 城市名稱）
+_TAX_COLUMNS = [
+    ("利姆薩·羅敏薩", "Limsa Lominsa"),
+    ("格里達尼亞", "Gridania"),
+    ("烏爾達哈", "Ul'dah"),
+    ("伊修加德", "Ishgard"),
+    ("黃金港", "Kugane"),
+    ("水晶都", "Crystarium"),
+    ("舊薩雷安", "Old Sharlayan"),
+    ("圖萊尤拉", "Tuliyollal"),
+]
+
 
 def search_and_display(query: str, category: int = 0, page: int = 1) -> tuple:
     """搜尋並顯示結果.
@@ -134,20 +150,19 @@ def display_item_market(
     if ws_client:
         ws_data = ws_client.get_cached_data(item_id)
 
-    if ws_data and ws_data.get("data", {}).get("listings"):
+    if ws_data and ws_data.listings:
         # 使用 WebSocket 緩存的數據（更快）
-        cached = ws_data["data"]
         item_info = get_item_info(item_id)  # 物品資訊還是用 API
         market_data = {
-            "listings": cached.get("listings", []),
-            "recentHistory": cached.get("recentHistory", []),
-            "currentAveragePrice": cached.get("currentAveragePrice", 0),
-            "averagePrice": cached.get("averagePrice", 0),
-            "minPrice": cached.get("minPrice", 0),
-            "maxPrice": cached.get("maxPrice", 0),
-            "listingsCount": len(cached.get("listings", [])),
-            "regularSaleVelocity": cached.get("regularSaleVelocity", 0),
-            "lastUploadTime": int(ws_data["timestamp"] * 1000),
+            "listings": ws_data.listings,
+            "recentHistory": [],
+            "currentAveragePrice": 0,
+            "averagePrice": 0,
+            "minPrice": ws_data.min_price,
+            "maxPrice": 0,
+            "listingsCount": len(ws_data.listings),
+            "regularSaleVelocity": 0,
+            "lastUploadTime": int(ws_data.timestamp * 1000),
         }
     else:
         # 首次查詢，使用 REST API
@@ -172,29 +187,34 @@ def display_item_market(
     # 當選擇特定伺服器時，傳入伺服器名稱作為預設值
     default_world = selected_world if selected_world != "全部伺服器" else None
 
-    # 處理上架列表（支援雇員篩選）
-    listings_df = process_listings(
-        market_data.get("listings", []),
-        quality_filter,
-        default_world,
-        retainer_filter.strip() if retainer_filter else None,
-    )
+    # 跨伺服器比價需逐一請求各伺服器，先丟到背景執行，與下方的表格處理重疊
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        comparison_future = executor.submit(
+            create_cross_world_comparison,
+            item_id,
+            item_name,
+        )
 
-    # 處理交易歷史
-    history_df = process_history(
-        market_data.get("recentHistory", []),
-        quality_filter,
-        default_world,
-    )
+        # 處理上架列表（支援雇員篩選）
+        listings_df = process_listings(
+            market_data.get("listings", []),
+            quality_filter,
+            default_world,
+            retainer_filter.strip() if retainer_filter else None,
+        )
 
-    # 建立價格圖表
-    price_chart = create_price_chart(market_data, item_name)
+        # 處理交易歷史
+        history_df = process_history(
+            market_data.get("recentHistory", []),
+            quality_filter,
+            default_world,
+        )
 
-    # 建立跨伺服器比價
-    comparison_df, comparison_chart = create_cross_world_comparison(
-        item_id,
-        item_name,
-    )
+        # 建立價格圖表
+        price_chart = create_price_chart(market_data, item_name)
+
+        # 取得跨伺服器比價結果
+        comparison_df, comparison_chart = comparison_future.result()
 
     # 計算統計資訊
     current_avg = market_data.get("currentAveragePrice", 0)
@@ -239,27 +259,6 @@ def display_item_market(
     # NPC 售價（賣給商店的價格）
     vendor_price = item_info.get("PriceLow", 0)
 
-    # ClassJob ID 對應表
-    craft_job_names = {
-        8: "刻木匠", 9: "鍛鐵匠", 10: "鑄甲匠", 11: "雕金匠",
-        12: "製革匠", 13: "裁縫師", 14: "煉金術士", 15: "烹調師",
-    }
-
-    # 職業縮寫對應表
-    job_abbr_names = {
-        "PLD": "騎士", "WAR": "戰士", "DRK": "暗黑騎士", "GNB": "絕槍戰士",
-        "WHM": "白魔法師", "SCH": "學者", "AST": "占星術士", "SGE": "賢者",
-        "MNK": "武僧", "DRG": "龍騎士", "NIN": "忍者", "SAM": "武士", "RPR": "鐮刀師", "VPR": "蝰蛇劍士",
-        "BRD": "吟遊詩人", "MCH": "機工士", "DNC": "舞者",
-        "BLM": "黑魔法師", "SMN": "召喚師", "RDM": "赤魔法師", "PCT": "繪靈法師",
-        "PGL": "格鬥家", "GLA": "劍術師", "MRD": "斧術師", "LNC": "槍術師",
-        "ARC": "弓箭手", "ROG": "雙劍師", "THM": "咒術師", "ACN": "秘術師", "CNJ": "幻術師",
-        "CRP": "刻木匠", "BSM": "鍛鐵匠", "ARM": "鑄甲匠", "GSM": "雕金匠",
-        "LTW": "製革匠", "WVR": "裁縫師", "ALC": "煉金術士", "CUL": "烹調師",
-        "MIN": "採礦工", "BTN": "園藝工", "FSH": "捕魚人",
-        "BLU": "青魔法師",
-    }
-
     # === A. 獲取方式 ===
     obtain_methods = []
     gcl = item_info.get("GameContentLinks", {})
@@ -272,7 +271,7 @@ def display_item_market(
         craft_jobs = []
         for recipe in recipes[:2]:
             job_id = recipe.get("ClassJobID", 0)
-            job_name = craft_job_names.get(job_id, "")
+            job_name = CRAFT_JOB_NAMES.get(job_id, "")
             level = recipe.get("Level", 0)
             if job_name:
                 craft_jobs.append(f"{job_name} Lv.{level}")
@@ -347,8 +346,8 @@ def display_item_market(
 
         # 職業限制
         cjc = item_info.get("ClassJobCategory") or {}
-        jobs = [job_abbr_names.get(k, k) for k, v in cjc.items()
-                if v == 1 and not k.endswith("Target") and k != "ID" and k in job_abbr_names]
+        jobs = [JOB_ABBR_NAMES.get(k, k) for k, v in cjc.items()
+                if v == 1 and not k.endswith("Target") and k != "ID" and k in JOB_ABBR_NAMES]
         if jobs:
             if len(jobs) > 5:
                 equip_lines.append(f"**職業:** {', '.join(jobs[:5])} 等 {len(jobs)} 職業")
@@ -384,53 +383,33 @@ def display_item_market(
 
         equip_text = "\n".join(equip_lines)
 
-    # 組合物品資訊卡
-    item_card = f"""### 🏷️ 物品資訊
+    # 組合物品資訊卡（空的區塊直接略過）
+    vendor_line = f"💰 NPC 售價: {vendor_price:,} Gil\n" if vendor_price > 0 else ""
+    sections = [
+        f"""### 🏷️ 物品資訊
 **物品 ID:** `{item_id}` | 📦 堆疊: {stack_size}
 
 {tradable_text}
-{f"💰 NPC 售價: {vendor_price:,} Gil" if vendor_price > 0 else ""}
-"""
-
-    # 裝備屬性（如果是裝備）
-    if equip_text:
-        item_card += f"""
----
-### ⚔️ 裝備屬性
+{vendor_line}""",
+        f"""### ⚔️ 裝備屬性
 {equip_text}
-"""
-
-    # 獲取方式
-    item_card += f"""
----
-### 📍 獲取方式
+""" if equip_text else None,
+        f"""### 📍 獲取方式
 {obtain_text}
-"""
-
-    # 用途資訊
-    if usage_methods:
-        item_card += f"""
----
-### 📦 用途
+""",
+        f"""### 📦 用途
 {usage_text}
-"""
-
-    # 外部連結
-    item_card += f"""
----
-### 🔗 外部連結
+""" if usage_methods else None,
+        f"""### 🔗 外部連結
 - [Universalis](https://universalis.app/market/{item_id})
 - [Teamcraft](https://ffxivteamcraft.com/db/zh/item/{item_id})
 - [Garland Tools](https://garlandtools.org/db/#item/{item_id})
-"""
-
-    # 物品說明
-    if item_desc:
-        item_card += f"""
----
-### 📜 說明
+""",
+        f"""### 📜 說明
 *{item_desc}*
-"""
+""" if item_desc else None,
+    ]
+    item_card = "\n---\n".join(section for section in sections if section)
 
     return (
         info_text,
@@ -443,24 +422,6 @@ def display_item_market(
     )
 
 
-def _format_tax_row(world: str, tax_data: dict) -> Optional[dict]:
-    """格式化單一伺服器的稅率資料."""
-    if not tax_data:
-        return None
-    uldah_tax = tax_data.get("Ul'dah", 0)
-    return {
-        "伺服器": world,
-        "利姆薩·羅敏薩": f"{tax_data.get('Limsa Lominsa', 0)}%",
-        "格里達尼亞": f"{tax_data.get('Gridania', 0)}%",
-        "烏爾達哈": f"{uldah_tax}%",
-        "伊修加德": f"{tax_data.get('Ishgard', 0)}%",
-        "黃金港": f"{tax_data.get('Kugane', 0)}%",
-        "水晶都": f"{tax_data.get('Crystarium', 0)}%",
-        "舊薩雷安": f"{tax_data.get('Old Sharlayan', 0)}%",
-        "圖萊尤拉": f"{tax_data.get('Tuliyollal', 0)}%",
-    }
-
-
 def display_tax_rates(selected_world: str) -> pd.DataFrame:
     """顯示稅率資訊.
 
@@ -472,22 +433,22 @@ def display_tax_rates(selected_world: str) -> pd.DataFrame:
     """
     if selected_world == "全部伺服器":
         # 並行請求所有伺服器的稅率
-        all_taxes = []
+        tax_by_world = {}
         with ThreadPoolExecutor(max_workers=8) as executor:
             future_to_world = {
                 executor.submit(get_tax_rates, world): world
                 for world in WORLD_NAMES
             }
-            for future in future_to_world:
+            for future in as_completed(future_to_world):
                 world = future_to_world[future]
-                tax_data = future.result()
-                row = _format_tax_row(world, tax_data)
-                if row:
-                    all_taxes.append(row)
+                tax_by_world[world] = future.result()
 
-        # 按原始順序排序
-        all_taxes.sort(key=lambda x: WORLD_NAMES.index(x["伺服器"]))
-        return pd.DataFrame(all_taxes)
+        # 依 WORLD_NAMES 順序組合，不需再排序
+        worlds = [world for world in WORLD_NAMES if tax_by_world.get(world)]
+        columns = {"伺服器": worlds}
+        for name, city in _TAX_COLUMNS:
+            columns[name] = [f"{tax_by_world[world].get(city, 0)}%" for world in worlds]
+        return pd.DataFrame(columns)
 
     tax_data = get_tax_rates(selected_world)
     if not tax_data:
@@ -514,20 +475,19 @@ def display_market_activity(selected_world: str) -> pd.DataFrame:
     if not activity:
         return pd.DataFrame({"訊息": ["無法取得市場動態"]})
 
-    data = []
-    for item in activity:
-        nq_price = item["nq_min"]
-        hq_price = item["hq_min"]
-        data.append({
-            "物品 ID": item["id"],
-            "物品名稱": item["name"],
-            "NQ 最低價": format_price(nq_price) if nq_price else "-",
-            "HQ 最低價": format_price(hq_price) if hq_price else "-",
-            "上架數": item["listing_count"],
-            "更新時間": format_relative_time(item["last_update"]),
-        })
+    # 價格欄位一次批量格式化
+    now_ts = time.time()
+    nq_prices = np.array([item["nq_min"] or 0 for item in activity])
+    hq_prices = np.array([item["hq_min"] or 0 for item in activity])
 
-    return pd.DataFrame(data)
+    return pd.DataFrame({
+        "物品 ID": [item["id"] for item in activity],
+        "物品名稱": [item["name"] for item in activity],
+        "NQ 最低價": np.where(nq_prices > 0, format_prices_vec(nq_prices), "-"),
+        "HQ 最低價": np.where(hq_prices > 0, format_prices_vec(hq_prices), "-"),
+        "上架數": [item["listing_count"] for item in activity],
+        "更新時間": [format_relative_time_ts(item["last_update"], now_ts) for item in activity],
+    })
 
 
 def display_upload_stats() -> Tuple[pd.DataFrame, go.Figure]:
@@ -540,18 +500,17 @@ def display_upload_stats() -> Tuple[pd.DataFrame, go.Figure]:
     if not stats:
         return pd.DataFrame({"訊息": ["無法取得統計資訊"]}), go.Figure()
 
-    # 繁中服伺服器名稱列表
-    tw_world_names = set(WORLDS.values())
-
-    # 篩選繁中服的數據
+    # 篩選繁中服的數據（只查詢繁中服伺服器，不掃描全部伺服器）
     tw_stats = []
-    for world_name, data in stats.items():
-        if world_name in tw_world_names:
-            count = data.get("count", 0) if isinstance(data, dict) else data
-            tw_stats.append({
-                "伺服器": world_name,
-                "上傳次數": count,
-            })
+    for world_name in WORLD_NAMES:
+        data = stats.get(world_name)
+        if data is None:
+            continue
+        count = data.get("count", 0) if isinstance(data, dict) else data
+        tw_stats.append({
+            "伺服器": world_name,
+            "上傳次數": count,
+        })
 
     df = pd.DataFrame(tw_stats)
     fig = create_upload_stats_chart(df)
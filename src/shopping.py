@@ -1,12 +1,25 @@
 """購物清單與雇員銷售建議模組."""
 
-from concurrent.futures import ThreadPoolExecutor, as_completed
+import re
+import time
+from concurrent.futures import ThreadPoolExecutor
 from typing import Optional
 
-from .api import get_item_info, get_market_data, search_items
+import numpy as np
+import pandas as pd
+
+from .api import (
+    get_item_info,
+    get_multi_item_market_data_fast,
+    search_items,
+)
 from .config import DATA_CENTER, WORLDS, WORLD_NAMES
 
 
+# 購物清單每行格式: "物品名 x10" 或 "物品名 *10" 或 "物品名 10"
+_LINE_RE = re.compile(r"(.+?)\s*[x\*×]?\s*(\d+)\s*$", re.IGNORECASE)
+
+
 def parse_shopping_list(text: str) -> list[dict]:
     """解析購物清單文字.
 
@@ -25,9 +38,8 @@ def parse_shopping_list(text: str) -> list[dict]:
         return []
 
     items = []
-    lines = text.strip().split("\n")
 
-    for line in lines:
+    for line in text.splitlines():
         line = line.strip()
         if not line:
             continue
@@ -36,9 +48,7 @@ def parse_shopping_list(text: str) -> list[dict]:
         quantity = 1
         name = line
 
-        # 格式: "物品名 x10" 或 "物品名 *10" 或 "物品名 10"
-        import re
-        match = re.match(r"(.+?)\s*[x\*×]?\s*(\d+)\s*$", line, re.IGNORECASE)
+        match = _LINE_RE.match(line)
         if match:
             name = match.group(1).strip()
             quantity = int(match.group(2))
@@ -53,49 +63,98 @@ def parse_shopping_list(text: str) -> list[dict]:
     return items
 
 
+def _resolve_item(name: str) -> dict:
+    """解析單一物品名稱（或 ID）為物品資訊.
+
+    Args:
+        name: 物品名稱或 ID
+
+    Returns:
+        {"name": str, "id": int or None}，找不到時包含 error
+    """
+    # 如果已經是 ID
+    if name.isdigit():
+        item_id = int(name)
+        item_info = get_item_info(item_id)
+        return {"name": item_info.get("Name", name), "id": item_id}
+
+    # 搜尋物品
+    results = search_items(name, limit=1).get("items", [])
+    if results:
+        return {"name": results[0]["name"], "id": results[0]["id"]}
+
+    return {"name": name, "id": None, "error": "找不到此物品"}
+
+
 def resolve_item_ids(items: list[dict]) -> list[dict]:
     """為購物清單中的物品解析 ID.
 
+    重複的物品名稱只查詢一次，不同名稱並行查詢。
+
     Args:
         items: 購物清單物品列表
 
     Returns:
         包含 ID 的物品列表
     """
-    resolved = []
+    unique_names = list(dict.fromkeys(item["name"] for item in items))
 
-    for item in items:
-        name = item["name"]
-        quantity = item["quantity"]
+    with ThreadPoolExecutor(max_workers=5) as executor:
+        resolved_by_name = dict(zip(unique_names, executor.map(_resolve_item, unique_names)))
 
-        # 如果已經是 ID
-        if name.isdigit():
-            item_id = int(name)
-            item_info = get_item_info(item_id)
-            resolved.append({
-                "name": item_info.get("Name", name),
-                "quantity": quantity,
-                "id": item_id,
-            })
-            continue
+    return [
+        {**resolved_by_name[item["name"]], "quantity": item["quantity"]}
+        for item in items
+    ]
 
-        # 搜尋物品
-        results = search_items(name, limit=1)
-        if results:
-            resolved.append({
-                "name": results[0]["name"],
-                "quantity": quantity,
-                "id": results[0]["id"],
-            })
-        else:
-            resolved.append({
-                "name": name,
-                "quantity": quantity,
-                "id": None,
-                "error": "找不到此物品",
-            })
 
-    return resolved
+def _group_listings_by_world(listings: list) -> dict[str, list]:
+    """將資料中心的上架列表依伺服器分組.
+
+    Args:
+        listings: 上架資料列表
+
+    Returns:
+        {伺服器名稱: 上架列表}
+    """
+    groups: dict[str, list] = {}
+    for listing in listings:
+        world_name = listing.get("worldName") or WORLDS.get(listing.get("worldID"))
+        if world_name:
+            groups.setdefault(world_name, []).append(listing)
+    return groups
+
+
+def _fill_quantity_cost(listings: list, quantity: int) -> Optional[int]:
+    """計算從最便宜的上架開始購買指定數量的總成本.
+
+    Args:
+        listings: 單一伺服器的上架列表
+        quantity: 需求數量
+
+    Returns:
+        總成本，數量不足時返回 None
+    """
+    if not listings:
+        return None
+
+    count = len(listings)
+    prices = np.fromiter((l["pricePerUnit"] for l in listings), dtype=np.int64, count=count)
+    quantities = np.fromiter((l["quantity"] for l in listings), dtype=np.int64, count=count)
+
+    # 按價格排序後累加數量，找出滿足需求的最後一筆上架
+    order = np.argsort(prices, kind="stable")
+    prices = prices[order]
+    quantities = quantities[order]
+    cumulative = np.cumsum(quantities)
+
+    if cumulative[-1] < quantity:
+        # 數量不足，標記為無貨
+        return None
+
+    k = int(np.searchsorted(cumulative, quantity))
+    bought_before = int(cumulative[k - 1]) if k > 0 else 0
+    return int((prices[:k] * quantities[:k]).sum() + prices[k] * (quantity - bought_before))
 
 
 def calculate_shopping_cost(items: list[dict], world_or_dc: str = None) -> dict:
@@ -103,7 +162,7 @@ def calculate_shopping_cost(items: list[dict], world_or_dc: str = None) -> dict:
 
     Args:
         items: 購物清單物品列表（需已解析 ID）
-        world_or_dc: 伺服器或資料中心
+        world_or_dc: 伺服器或資料中心（價格一律以整個資料中心比較各伺服器）
 
     Returns:
         {
@@ -124,12 +183,17 @@ def calculate_shopping_cost(items: list[dict], world_or_dc: str = None) -> dict:
             "all_on_best": bool,  # 是否所有物品都在最佳伺服器有貨
         }
     """
-    if world_or_dc is None:
-        world_or_dc = DATA_CENTER
-
-    result_items = []
     world_totals = {name: 0 for name in WORLD_NAMES}
     world_availability = {name: 0 for name in WORLD_NAMES}  # 有貨的物品數
+    world_missing = {name: False for name in WORLD_NAMES}  # 是否有物品缺貨
+
+    # 需比較所有伺服器，因此一律批量取得整個資料中心的上架資料（重複物品只請求一次）。
+    # 不限制上架數量：限制時 Universalis 只返回全區最便宜的 N 筆，較貴的伺服器會被截斷。
+    # 此處不使用交易記錄，因此 entries=0。
+    item_ids = sorted({item["id"] for item in items if item.get("id")})
+    market_cache = get_multi_item_market_data_fast(
+        item_ids, DATA_CENTER, listings=None, entries=0
+    )
 
     def fetch_item_prices(item: dict) -> dict:
         """取得單一物品在各伺服器的價格."""
@@ -144,37 +208,15 @@ def calculate_shopping_cost(items: list[dict], world_or_dc: str = None) -> dict:
 
         item_id = item["id"]
         quantity = item["quantity"]
-        prices = {}
 
-        # 取得各伺服器價格
-        for world_name in WORLD_NAMES:
-            try:
-                market_data = get_market_data(item_id, world_name)
-                listings = market_data.get("listings", [])
-
-                if listings:
-                    # 計算能滿足需求數量的最低成本
-                    total_cost = 0
-                    remaining = quantity
-                    # 按價格排序
-                    sorted_listings = sorted(listings, key=lambda x: x["pricePerUnit"])
-
-                    for listing in sorted_listings:
-                        if remaining <= 0:
-                            break
-                        buy_qty = min(remaining, listing["quantity"])
-                        total_cost += buy_qty * listing["pricePerUnit"]
-                        remaining -= buy_qty
-
-                    if remaining <= 0:
-                        prices[world_name] = total_cost
-                    else:
-                        # 數量不足，標記為無貨
-                        prices[world_name] = None
-                else:
-                    prices[world_name] = None
-            except Exception:
-                prices[world_name] = None
+        # 一次取得整個資料中心的上架資料，再依伺服器分組
+        market_data = market_cache.get(item_id, {})
+        listings_by_world = _group_listings_by_world(market_data.get("listings", []))
+
+        prices = {
+            world_name: _fill_quantity_cost(listings_by_world.get(world_name, []), quantity)
+            for world_name in WORLD_NAMES
+        }
 
         # 找最佳伺服器
         valid_prices = {w: p for w, p in prices.items() if p is not None}
@@ -192,25 +234,27 @@ def calculate_shopping_cost(items: list[dict], world_or_dc: str = None) -> dict:
             "best_price": best_price,
         }
 
-    # 並行取得價格
-    with ThreadPoolExecutor(max_workers=5) as executor:
-        futures = [executor.submit(fetch_item_prices, item) for item in items]
-        for future in as_completed(futures):
-            result_items.append(future.result())
+    # 市場數據已批量取得，依清單順序計算各物品價格
+    result_items = [fetch_item_prices(item) for item in items]
 
     # 計算各伺服器總價
     for item in result_items:
+        prices = item.get("prices", {})
         for world_name in WORLD_NAMES:
-            price = item.get("prices", {}).get(world_name)
-            if price is not None:
+            price = prices.get(world_name)
+            if price is None:
+                world_missing[world_name] = True
+            else:
                 world_totals[world_name] += price
                 world_availability[world_name] += 1
-            else:
-                # 無貨的伺服器設為無限大（不考慮）
-                world_totals[world_name] = float("inf")
+
+    # 有物品缺貨的伺服器不列入比較
+    world_totals = {
+        w: None if world_missing[w] else world_totals[w] for w in WORLD_NAMES
+    }
 
     # 找整體最佳伺服器
-    valid_totals = {w: t for w, t in world_totals.items() if t != float("inf")}
+    valid_totals = {w: t for w, t in world_totals.items() if t is not None}
     if valid_totals:
         best_world = min(valid_totals, key=valid_totals.get)
         best_total = valid_totals[best_world]
@@ -222,7 +266,7 @@ def calculate_shopping_cost(items: list[dict], world_or_dc: str = None) -> dict:
 
     return {
         "items": result_items,
-        "world_totals": {w: t if t != float("inf") else None for w, t in world_totals.items()},
+        "world_totals": world_totals,
         "best_world": best_world,
         "best_total": best_total,
         "all_on_best": all_on_best,
@@ -303,63 +347,6 @@ def format_shopping_result(result: dict) -> str:
 # 雇員銷售建議
 # ============================================================
 
-def analyze_sale_velocity(item_id: int, world_or_dc: str = None) -> dict:
-    """分析物品的銷售速度.
-
-    Args:
-        item_id: 物品 ID
-        world_or_dc: 伺服器或資料中心
-
-    Returns:
-        {
-            "sales_per_day": float,  # 平均每日銷量
-            "avg_price": int,        # 平均成交價
-            "total_sales": int,      # 總銷售數量
-            "days_analyzed": int,    # 分析天數
-        }
-    """
-    if world_or_dc is None:
-        world_or_dc = DATA_CENTER
-
-    market_data = get_market_data(item_id, world_or_dc)
-    history = market_data.get("recentHistory", [])
-
-    if not history:
-        return {
-            "sales_per_day": 0,
-            "avg_price": 0,
-            "total_sales": 0,
-            "days_analyzed": 0,
-        }
-
-    # 計算時間範圍
-    import time
-    now = time.time()
-    timestamps = [h.get("timestamp", 0) for h in history]
-
-    if not timestamps:
-        return {
-            "sales_per_day": 0,
-            "avg_price": 0,
-            "total_sales": 0,
-            "days_analyzed": 0,
-        }
-
-    oldest = min(timestamps)
-    days = max((now - oldest) / 86400, 1)  # 至少算1天
-
-    total_qty = sum(h.get("quantity", 0) for h in history)
-    total_value = sum(h.get("pricePerUnit", 0) * h.get("quantity", 1) for h in history)
-    avg_price = total_value // total_qty if total_qty > 0 else 0
-
-    return {
-        "sales_per_day": round(total_qty / days, 1),
-        "avg_price": avg_price,
-        "total_sales": total_qty,
-        "days_analyzed": round(days, 1),
-    }
-
-
 def get_retainer_suggestions(world_or_dc: str = None, limit: int = 20) -> list:
     """取得雇員銷售建議.
 
@@ -377,59 +364,71 @@ def get_retainer_suggestions(world_or_dc: str = None, limit: int = 20) -> list:
     if world_or_dc is None:
         world_or_dc = DATA_CENTER
 
-    # 取得最近活躍的物品
-    recent_items = get_recent_activity(world_or_dc, limit=50)
+    # 取得最近活躍的物品（已帶有各物品的交易記錄）
+    recent_items = [item for item in get_recent_activity(world_or_dc, limit=50) if item.get("id")]
+    if not recent_items:
+        return []
 
-    results = []
+    # 所有物品的交易記錄攤平成一張長表，一次分組統計
+    history = pd.DataFrame(
+        [
+            (item["id"], h.get("timestamp", 0), h.get("quantity", 0), h.get("pricePerUnit", 0))
+            for item in recent_items
+            for h in item.get("recent_history") or []
+        ],
+        columns=["id", "timestamp", "quantity", "pricePerUnit"],
+    )
+    if history.empty:
+        return []
 
-    def analyze_item(item: dict) -> Optional[dict]:
-        """分析單一物品的銷售潛力."""
-        item_id = item.get("id")
-        if not item_id:
-            return None
+    history["value"] = history["pricePerUnit"] * history["quantity"]
+    stats = history.groupby("id").agg(
+        total_qty=("quantity", "sum"),
+        total_value=("value", "sum"),
+        oldest=("timestamp", "min"),
+    )
 
-        # 分析銷售速度
-        velocity = analyze_sale_velocity(item_id, world_or_dc)
+    days = ((time.time() - stats["oldest"]) / 86400).clip(lower=1)  # 至少算1天
+    stats["sales_per_day"] = (stats["total_qty"] / days).round(1)
+    stats["avg_price"] = np.where(
+        stats["total_qty"] > 0,
+        stats["total_value"] // stats["total_qty"].clip(lower=1),
+        0,
+    )
 
-        # 過濾掉銷量太低的物品
-        if velocity["sales_per_day"] < 0.5:  # 每天至少賣0.5個
-            return None
+    # 合併當前價格
+    items = pd.DataFrame({
+        "id": [item["id"] for item in recent_items],
+        "name": [item.get("name", f"物品 {item['id']}") for item in recent_items],
+        "nq_price": [item.get("nq_min") or 0 for item in recent_items],
+        "hq_price": [item.get("hq_min") or 0 for item in recent_items],
+        "listing_count": [item.get("listing_count", 0) for item in recent_items],
+    }).join(stats[["sales_per_day", "avg_price"]], on="id", how="inner")
 
-        # 取得當前價格
-        nq_min = item.get("nq_min") or 0
-        hq_min = item.get("hq_min") or 0
-        best_price = hq_min if hq_min > 0 else nq_min
+    items["best_price"] = np.where(items["hq_price"] > 0, items["hq_price"], items["nq_price"])
 
-        if best_price <= 0:
-            return None
+    # 過濾掉銷量太低（每天至少賣0.5個）或沒有價格的物品
+    items = items[(items["sales_per_day"] >= 0.5) & (items["best_price"] > 0)]
 
-        # 計算推薦分數（銷量 × 價格）
-        score = velocity["sales_per_day"] * best_price
+    # 計算推薦分數（銷量 × 價格）並取前幾名
+    top = items.assign(score=items["sales_per_day"] * items["best_price"]).nlargest(limit, "score")
 
-        return {
-            "id": item_id,
-            "name": item.get("name", f"物品 {item_id}"),
-            "nq_price": nq_min,
-            "hq_price": hq_min,
-            "sales_per_day": velocity["sales_per_day"],
-            "avg_price": velocity["avg_price"],
-            "listing_count": item.get("listing_count", 0),
-            "score": score,
-            "recommendation": _get_recommendation(velocity, best_price),
+    return [
+        {
+            "id": int(row.id),
+            "name": row.name,
+            "nq_price": int(row.nq_price),
+            "hq_price": int(row.hq_price),
+            "sales_per_day": float(row.sales_per_day),
+            "avg_price": int(row.avg_price),
+            "listing_count": int(row.listing_count),
+            "score": float(row.score),
+            "recommendation": _get_recommendation(
+                {"sales_per_day": row.sales_per_day}, row.best_price
+            ),
         }
-
-    # 並行分析
-    with ThreadPoolExecutor(max_workers=5) as executor:
-        futures = [executor.submit(analyze_item, item) for item in recent_items]
-        for future in as_completed(futures):
-            result = future.result()
-            if result:
-                results.append(result)
-
-    # 按推薦分數排序
-    results.sort(key=lambda x: x["score"], reverse=True)
-
-    return results[:limit]
+        for row in top.itertuples(index=False)
+    ]
 
 
 def _get_recommendation(velocity: dict, price: int) -> str:
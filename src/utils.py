@@ -1,7 +1,9 @@
 """工具函數."""
 
+import time
 from datetime import datetime
 
+import numpy as np
 import pandas as pd
 
 from .config import WORLDS
@@ -23,6 +25,30 @@ def format_price(price: int) -> str:
     return str(price)
 
 
+def format_prices_vec(prices) -> np.ndarray:
+    """批量格式化價格顯示（向量化版本，格式與 format_price 相同）.
+
+    Args:
+        prices: 價格序列
+
+    Returns:
+        格式化後的價格字串陣列
+    """
+    arr = np.asarray(prices, dtype=np.float64)
+    if arr.size == 0:
+        return np.array([], dtype=str)
+
+    return np.where(
+        arr >= 1_000_000,
+        np.char.mod("%.2fM", arr / 1_000_000),
+        np.where(
+            arr >= 1_000,
+            np.char.mod("%.1fK", arr / 1_000),
+            np.char.mod("%d", arr.astype(np.int64)),
+        ),
+    )
+
+
 def format_timestamp(timestamp: int) -> str:
     """格式化時間戳.
 
@@ -43,11 +69,12 @@ def format_timestamp(timestamp: int) -> str:
     return dt.strftime("%Y-%m-%d %H:%M")
 
 
-def format_relative_time(timestamp: int) -> str:
-    """格式化相對時間.
+def format_relative_time_ts(timestamp: int, now_ts: float) -> str:
+    """以預先取得的目前時間格式化相對時間（批次處理用）.
 
     Args:
         timestamp: Unix 時間戳（秒或毫秒）
+        now_ts: 目前的 Unix 時間戳（time.time()）
 
     Returns:
         相對時間字串（如「3 小時前」）
@@ -59,19 +86,65 @@ def format_relative_time(timestamp: int) -> str:
     if timestamp > 9999999999:
         timestamp = timestamp // 1000
 
-    now = datetime.now()
-    dt = datetime.fromtimestamp(timestamp)
-    diff = now - dt
-
-    if diff.days > 0:
-        return f"{diff.days} 天前"
-    if diff.seconds >= 3600:
-        return f"{diff.seconds // 3600} 小時前"
-    if diff.seconds >= 60:
-        return f"{diff.seconds // 60} 分鐘前"
+    diff = int(now_ts - timestamp)
+
+    if diff >= 86400:
+        return f"{diff // 86400} 天前"
+    if diff >= 3600:
+        return f"{diff // 3600} 小時前"
+    if diff >= 60:
+        return f"{diff // 60} 分鐘前"
     return "剛剛"
 
 
+def format_relative_time(timestamp: int) -> str:
+    """格式化相對時間.
+
+    Args:
+        timestamp: Unix 時間戳（秒或毫秒）
+
+    Returns:
+        相對時間字串（如「3 小時前」）
+    """
+    return format_relative_time_ts(timestamp, time.time())
+
+
+_LISTING_FIELDS = [
+    "hq", "pricePerUnit", "quantity", "total",
+    "retainerName", "worldName", "worldID", "lastReviewTime",
+]
+_HISTORY_FIELDS = [
+    "hq", "pricePerUnit", "quantity", "total",
+    "buyerName", "worldName", "worldID", "timestamp",
+]
+
+
+def _records_frame(records: list, fields: list, quality: str) -> pd.DataFrame:
+    """將 API 記錄轉為 DataFrame 並以布林遮罩篩選品質."""
+    df = pd.DataFrame.from_records(records).reindex(columns=fields)
+    df["hq"] = df["hq"].eq(True)
+
+    if quality == "hq":
+        df = df[df["hq"]]
+    elif quality == "nq":
+        df = df[~df["hq"]]
+    return df
+
+
+def _world_name_column(df: pd.DataFrame, default_world: str = None) -> pd.Series:
+    """解析伺服器名稱：優先使用 worldName，其次使用 worldID 對應，最後使用預設值."""
+    world_ids = df["worldID"].fillna(0).astype(np.int64)
+    mapped = world_ids.map(WORLDS).fillna(world_ids.astype(str))
+    mapped = mapped.where(world_ids != 0, default_world or "-")
+
+    world_names = df["worldName"].fillna("")
+    world_names = world_names.where(world_names != "", mapped)
+
+    # 以伺服器順序作為分類（其他名稱附加在後），欄位以整數代碼儲存
+    categories = list(dict.fromkeys([*WORLDS.values(), *world_names.unique()]))
+    return world_names.astype(pd.CategoricalDtype(categories))
+
+
 def process_listings(
     listings: list,
     quality: str = "all",
@@ -92,40 +165,26 @@ def process_listings(
     if not listings:
         return pd.DataFrame()
 
-    data = []
-    for listing in listings:
-        if quality == "hq" and not listing.get("hq"):
-            continue
-        if quality == "nq" and listing.get("hq"):
-            continue
-
-        retainer_name = listing.get("retainerName", "")
-
-        # 雇員名稱篩選（部分匹配，不區分大小寫）
-        if retainer_filter:
-            if retainer_filter.lower() not in retainer_name.lower():
-                continue
-
-        # 優先使用 worldName，其次使用 worldID 對應，最後使用預設值
-        world_name = listing.get("worldName")
-        if not world_name:
-            world_id = listing.get("worldID")
-            if world_id:
-                world_name = WORLDS.get(world_id, str(world_id))
-            else:
-                world_name = default_world or "-"
-
-        data.append({
-            "品質": "HQ" if listing.get("hq") else "NQ",
-            "單價": listing.get("pricePerUnit", 0),
-            "數量": listing.get("quantity", 0),
-            "總價": listing.get("total", 0),
-            "雇員": retainer_name,
-            "伺服器": world_name,
-            "更新時間": format_relative_time(listing.get("lastReviewTime", 0)),
-        })
-
-    return pd.DataFrame(data)
+    df = _records_frame(listings, _LISTING_FIELDS, quality)
+    df["retainerName"] = df["retainerName"].fillna("").astype(str)
+
+    # 雇員名稱篩選（部分匹配，不區分大小寫）
+    if retainer_filter:
+        df = df[df["retainerName"].str.contains(retainer_filter, case=False, regex=False)]
+
+    df = df.reset_index(drop=True)
+    now_ts = time.time()
+    return pd.DataFrame({
+        "品質": np.where(df["hq"], "HQ", "NQ"),
+        "單價": df["pricePerUnit"].fillna(0).astype(np.int64),
+        "數量": df["quantity"].fillna(0).astype(np.int64),
+        "總價": df["total"].fillna(0).astype(np.int64),
+        "雇員": df["retainerName"],
+        "伺服器": _world_name_column(df, default_world),
+        "更新時間": df["lastReviewTime"].fillna(0).map(
+            lambda timestamp: format_relative_time_ts(timestamp, now_ts)
+        ),
+    })
 
 
 def process_history(
@@ -146,30 +205,13 @@ def process_history(
     if not entries:
         return pd.DataFrame()
 
-    data = []
-    for entry in entries:
-        if quality == "hq" and not entry.get("hq"):
-            continue
-        if quality == "nq" and entry.get("hq"):
-            continue
-
-        # 優先使用 worldName，其次使用 worldID 對應，最後使用預設值
-        world_name = entry.get("worldName")
-        if not world_name:
-            world_id = entry.get("worldID")
-            if world_id:
-                world_name = WORLDS.get(world_id, str(world_id))
-            else:
-                world_name = default_world or "-"
-
-        data.append({
-            "品質": "HQ" if entry.get("hq") else "NQ",
-            "單價": entry.get("pricePerUnit", 0),
-            "數量": entry.get("quantity", 0),
-            "總價": entry.get("total", 0),
-            "買家": entry.get("buyerName", ""),
-            "伺服器": world_name,
-            "成交時間": format_timestamp(entry.get("timestamp", 0)),
-        })
-
-    return pd.DataFrame(data)
+    df = _records_frame(entries, _HISTORY_FIELDS, quality).reset_index(drop=True)
+    return pd.DataFrame({
+        "品質": np.where(df["hq"], "HQ", "NQ"),
+        "單價": df["pricePerUnit"].fillna(0).astype(np.int64),
+        "數量": df["quantity"].fillna(0).astype(np.int64),
+        "總價": df["total"].fillna(0).astype(np.int64),
+        "買家": df["buyerName"].fillna(""),
+        "伺服器": _world_name_column(df, default_world),
+        "成交時間": df["timestamp"].fillna(0).map(format_timestamp),
+    })
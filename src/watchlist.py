@@ -1,14 +1,21 @@
 """監看清單管理（使用瀏覽器 LocalStorage）."""
 
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 from typing import Tuple
 
 import pandas as pd
 
-from .api import get_item_info, get_market_data
+from .api import _ttl_cache, get_item_info, get_market_data
 from .config import DATA_CENTER
 
 
+@_ttl_cache(ttl=30)  # 連續刷新清單時不重複請求
+def _cached_market(item_id: int) -> dict:
+    """取得物品在資料中心的市場數據（30 秒內重複查詢直接使用快取）."""
+    return get_market_data(item_id, DATA_CENTER)
+
+
 def get_watchlist_with_alerts(watchlist: list) -> Tuple[pd.DataFrame, list]:
     """取得監看清單及當前價格，並回傳達標提示.
 
@@ -24,8 +31,13 @@ def get_watchlist_with_alerts(watchlist: list) -> Tuple[pd.DataFrame, list]:
     data = []
     alerts = []
 
-    for item in watchlist:
-        market_data = get_market_data(item["id"], DATA_CENTER)
+    # 並行取得所有物品的市場數據
+    with ThreadPoolExecutor(max_workers=min(16, len(watchlist))) as executor:
+        market_results = list(executor.map(
+            _cached_market, [item["id"] for item in watchlist]
+        ))
+
+    for item, market_data in zip(watchlist, market_results):
         min_price = market_data.get("minPrice", 0) if market_data else 0
         target = item.get("target_price", 0)
 
@@ -111,7 +123,11 @@ def remove_item_from_list(
         df, _ = get_watchlist_with_alerts(watchlist)
         return "請輸入物品 ID", df, watchlist
 
-    watchlist = [item for item in watchlist if item["id"] != int(item_id)]
+    item_id = int(item_id)
+    for index, item in enumerate(watchlist):
+        if item["id"] == item_id:
+            del watchlist[index]
+            break
 
     df, _ = get_watchlist_with_alerts(watchlist)
     return "已移除", df, watchlist
@@ -3,8 +3,9 @@
 import asyncio
 import threading
 import time
+from collections import defaultdict, deque, namedtuple
+from concurrent.futures import ThreadPoolExecutor
 from typing import Callable, Optional
-from queue import Queue
 
 import bson
 import websockets
@@ -15,7 +16,11 @@ from .config import DATA_CENTER, WORLD_IDS, WORLDS
 UNIVERSALIS_WS_URL = "wss://universalis.app/api/ws"
 
 # 陸行鳥資料中心的所有伺服器 ID
-CHOCOBO_WORLD_IDS = list(WORLDS.keys())
+CHOCOBO_WORLD_IDS = frozenset(WORLDS.keys())
+
+# 物品緩存項目：只保留 UI 需要的欄位，而非整個 WebSocket 消息
+# min_price 只取自上架資料；交易事件沿用先前的值，從未收到上架時為 None
+CacheEntry = namedtuple("CacheEntry", "timestamp min_price world event listings")
 
 
 class UniversalisWebSocket:
@@ -23,23 +28,32 @@ class UniversalisWebSocket:
 
     # 最大保留的即時事件數量
     MAX_LIVE_EVENTS = 100
+    # 消息佇列上限（超過時丟棄最舊的消息）
+    MAX_QUEUED_MESSAGES = 1024
+    # 執行事件回調的執行緒數
+    CALLBACK_WORKERS = 4
 
     def __init__(self):
         self._ws: Optional[websockets.WebSocketClientProtocol] = None
         self._loop: Optional[asyncio.AbstractEventLoop] = None
         self._thread: Optional[threading.Thread] = None
         self._running = False
-        self._subscriptions: set = set()
-        self._callbacks: dict[str, list[Callable]] = {}
-        self._message_queue: Queue = Queue()
+        # 已訂閱頻道: {(channel, world_id): 預先編碼的 bson 訂閱訊息}
+        self._subscriptions: dict[tuple[str, Optional[int]], bytes] = {}
+        self._callbacks: defaultdict[str, list[Callable]] = defaultdict(list)
+        # 回調在獨立執行緒池中執行，避免阻塞消息接收
+        self._callback_executor: Optional[ThreadPoolExecutor] = None
+        self._message_queue: deque = deque(maxlen=self.MAX_QUEUED_MESSAGES)
         self._connected = False
-        # 物品數據緩存: {item_id: {"data": {...}, "timestamp": time}}
-        self._item_cache: dict[int, dict] = {}
+        # 物品數據緩存: {item_id: CacheEntry}
+        self._item_cache: dict[int, CacheEntry] = {}
         # 當前訂閱的物品 ID
         self._watched_items: set[int] = set()
         # 即時交易事件列表 (最新的在前面)
         self._live_events: list[dict] = []
         self._live_events_lock = threading.Lock()
+        # 保護訂閱、物品緩存與伺服器統計的複合讀寫（呼叫端執行緒與事件循環執行緒共用）
+        self._lock = threading.RLock()
         # 各伺服器最後收到數據的時間: {world_id: timestamp}
         self._world_last_update: dict[int, float] = {}
         self._world_event_count: dict[int, int] = {}  # 事件計數
@@ -50,6 +64,9 @@ class UniversalisWebSocket:
             return
 
         self._running = True
+        self._callback_executor = ThreadPoolExecutor(
+            max_workers=self.CALLBACK_WORKERS, thread_name_prefix="ws-callback"
+        )
         self._thread = threading.Thread(target=self._run_event_loop, daemon=True)
         self._thread.start()
 
@@ -68,6 +85,9 @@ class UniversalisWebSocket:
             self._loop.call_soon_threadsafe(self._loop.stop)
         if self._thread:
             self._thread.join(timeout=3)
+        if self._callback_executor:
+            self._callback_executor.shutdown(wait=False)
+            self._callback_executor = None
 
     def _run_event_loop(self):
         """在背景執行緒中運行事件循環."""
@@ -94,14 +114,16 @@ class UniversalisWebSocket:
                     print("WebSocket 已連接到 Universalis")
 
                     # 重新訂閱之前的頻道
-                    for channel in self._subscriptions:
-                        await self._send_subscribe(channel)
+                    with self._lock:
+                        frames = list(self._subscriptions.values())
+                    if frames:
+                        await self._send_subscribe_many(frames)
 
-                    # 監聽消息
+                    # 監聽消息（處理過程不需 await，直接同步呼叫）
                     async for message in ws:
                         if not self._running:
                             break
-                        await self._handle_message(message)
+                        self._handle_message(message)
 
             except websockets.exceptions.ConnectionClosed:
                 print("WebSocket 連線已關閉，嘗試重新連接...")
@@ -112,21 +134,27 @@ class UniversalisWebSocket:
             if self._running:
                 await asyncio.sleep(5)  # 等待後重新連接
 
-    async def _send_subscribe(self, channel: str):
+    async def _send_subscribe(self, key: tuple[str, Optional[int]], frame: bytes):
         """發送訂閱消息."""
         if self._ws and self._connected:
-            msg = bson.encode({"event": "subscribe", "channel": channel})
-            await self._ws.send(msg)
-            print(f"已訂閱頻道: {channel}")
+            await self._ws.send(frame)
+            print(f"已訂閱頻道: {self._format_channel(*key)}")
+
+    async def _send_subscribe_many(self, frames: list[bytes]):
+        """批次發送多個預先編碼的訂閱消息."""
+        if self._ws and self._connected:
+            await asyncio.gather(*(self._ws.send(frame) for frame in frames))
+            print(f"已訂閱 {len(frames)} 個頻道")
 
-    async def _send_unsubscribe(self, channel: str):
+    async def _send_unsubscribe(self, key: tuple[str, Optional[int]]):
         """發送取消訂閱消息."""
         if self._ws and self._connected:
+            channel = self._format_channel(*key)
             msg = bson.encode({"event": "unsubscribe", "channel": channel})
             await self._ws.send(msg)
             print(f"已取消訂閱頻道: {channel}")
 
-    async def _handle_message(self, message: bytes):
+    def _handle_message(self, message: bytes):
         """處理收到的消息."""
         try:
             data = bson.decode(message)
@@ -140,12 +168,23 @@ class UniversalisWebSocket:
 
             # 如果是我們關注的物品，更新緩存
             if item_id and item_id in self._watched_items:
-                self._item_cache[item_id] = {
-                    "data": data,
-                    "timestamp": time.time(),
-                    "event": event,
-                    "world": world_id,
-                }
+                listings = data.get("listings") or []
+                min_price = min(
+                    (listing.get("pricePerUnit", 0) for listing in listings), default=None
+                )
+                with self._lock:
+                    # 取得鎖後再確認一次，避免在 unwatch_item 之後寫回緩存
+                    if item_id in self._watched_items:
+                        if min_price is None:
+                            previous = self._item_cache.get(item_id)
+                            min_price = previous.min_price if previous else None
+                        self._item_cache[item_id] = CacheEntry(
+                            timestamp=time.time(),
+                            min_price=min_price,
+                            world=world_id,
+                            event=event,
+                            listings=listings,
+                        )
 
             # 儲存即時事件 (listings/add, sales/add, sales/remove)
             if event in ("listings/add", "sales/add", "listings/remove"):
@@ -166,23 +205,47 @@ class UniversalisWebSocket:
 
                 # 更新伺服器最後更新時間
                 if world_id:
-                    self._world_last_update[world_id] = current_time
-                    self._world_event_count[world_id] = self._world_event_count.get(world_id, 0) + 1
+                    with self._lock:
+                        self._world_last_update[world_id] = current_time
+                        self._world_event_count[world_id] = self._world_event_count.get(world_id, 0) + 1
 
             # 放入消息佇列
-            self._message_queue.put(data)
+            self._message_queue.append(data)
 
-            # 呼叫回調
-            if event in self._callbacks:
-                for callback in self._callbacks[event]:
-                    try:
-                        callback(data)
-                    except Exception as e:
-                        print(f"回調錯誤: {e}")
+            # 呼叫回調（交給執行緒池，不等待完成）
+            for callback in self._callbacks.get(event, ()):
+                self._loop.run_in_executor(
+                    self._callback_executor, self._run_callback, callback, data
+                )
 
         except Exception as e:
             print(f"處理消息錯誤: {e}")
 
+    @staticmethod
+    def _run_callback(callback: Callable, data: dict):
+        """執行單一事件回調並記錄錯誤."""
+        try:
+            callback(data)
+        except Exception as e:
+            print(f"回調錯誤: {e}")
+
+    @staticmethod
+    def _format_channel(channel: str, world_id: int = None) -> str:
+        """組合頻道名稱（可附加伺服器過濾）."""
+        if world_id:
+            return f"{channel}{{world={world_id}}}"
+        return channel
+
+    def _add_subscription(self, key: tuple[str, Optional[int]]) -> bytes:
+        """記錄訂閱頻道並回傳其 bson 訂閱訊息（只在首次訂閱時組合頻道名稱並編碼）."""
+        with self._lock:
+            frame = self._subscriptions.get(key)
+            if frame is None:
+                channel = self._format_channel(*key)
+                frame = bson.encode({"event": "subscribe", "channel": channel})
+                self._subscriptions[key] = frame
+            return frame
+
     def subscribe(self, channel: str, world_id: int = None):
         """訂閱頻道.
 
@@ -190,16 +253,12 @@ class UniversalisWebSocket:
             channel: 頻道名稱 (listings/add, listings/remove, sales/add)
             world_id: 可選的伺服器 ID，用於過濾
         """
-        if world_id:
-            full_channel = f"{channel}{{world={world_id}}}"
-        else:
-            full_channel = channel
-
-        self._subscriptions.add(full_channel)
+        key = (channel, world_id or None)
+        frame = self._add_subscription(key)
 
         if self._loop and self._connected:
             asyncio.run_coroutine_threadsafe(
-                self._send_subscribe(full_channel), self._loop
+                self._send_subscribe(key, frame), self._loop
             )
 
     def subscribe_item(self, item_id: int, world_or_dc: str = None):
@@ -212,27 +271,35 @@ class UniversalisWebSocket:
         # 訂閱該物品的上架和銷售更新
         if world_or_dc and world_or_dc != "全部伺服器":
             world_id = WORLD_IDS.get(world_or_dc)
-            if world_id:
-                self.subscribe("listings/add", world_id)
-                self.subscribe("sales/add", world_id)
+            world_ids = [world_id] if world_id else []
         else:
             # 訂閱陸行鳥資料中心所有伺服器
-            for world_id in CHOCOBO_WORLD_IDS:
-                self.subscribe("listings/add", world_id)
-                self.subscribe("sales/add", world_id)
+            world_ids = CHOCOBO_WORLD_IDS
+
+        # 只送出尚未訂閱的頻道，並合併為一次跨執行緒呼叫
+        frames = []
+        with self._lock:
+            for world_id in world_ids:
+                for channel in ("listings/add", "sales/add"):
+                    key = (channel, world_id)
+                    if key not in self._subscriptions:
+                        frames.append(self._add_subscription(key))
+        if not frames:
+            return
+
+        if self._loop and self._connected:
+            asyncio.run_coroutine_threadsafe(
+                self._send_subscribe_many(frames), self._loop
+            )
 
     def unsubscribe(self, channel: str, world_id: int = None):
         """取消訂閱頻道."""
-        if world_id:
-            full_channel = f"{channel}{{world={world_id}}}"
-        else:
-            full_channel = channel
-
-        self._subscriptions.discard(full_channel)
+        key = (channel, world_id or None)
+        self._subscriptions.pop(key, None)
 
         if self._loop and self._connected:
             asyncio.run_coroutine_threadsafe(
-                self._send_unsubscribe(full_channel), self._loop
+                self._send_unsubscribe(key), self._loop
             )
 
     def on_event(self, event: str, callback: Callable):
@@ -242,8 +309,6 @@ class UniversalisWebSocket:
             event: 事件名稱 (listings/add, listings/remove, sales/add)
             callback: 回調函數，接收事件數據
         """
-        if event not in self._callbacks:
-            self._callbacks[event] = []
         self._callbacks[event].append(callback)
 
     def get_latest_messages(self, limit: int = 10) -> list:
@@ -256,10 +321,10 @@ class UniversalisWebSocket:
             消息列表
         """
         messages = []
-        while not self._message_queue.empty() and len(messages) < limit:
+        for _ in range(min(limit, len(self._message_queue))):
             try:
-                messages.append(self._message_queue.get_nowait())
-            except:
+                messages.append(self._message_queue.popleft())
+            except IndexError:
                 break
         return messages
 
@@ -277,17 +342,18 @@ class UniversalisWebSocket:
 
     def unwatch_item(self, item_id: int):
         """停止關注某個物品."""
-        self._watched_items.discard(item_id)
-        self._item_cache.pop(item_id, None)
+        with self._lock:
+            self._watched_items.discard(item_id)
+            self._item_cache.pop(item_id, None)
 
-    def get_cached_data(self, item_id: int) -> Optional[dict]:
+    def get_cached_data(self, item_id: int) -> Optional[CacheEntry]:
         """取得物品的緩存數據.
 
         Args:
             item_id: 物品 ID
 
         Returns:
-            緩存數據，如果沒有則返回 None
+            緩存項目 (timestamp, min_price, world, event, listings)，如果沒有則返回 None
         """
         return self._item_cache.get(item_id)
 
@@ -302,7 +368,7 @@ class UniversalisWebSocket:
             是否有新更新
         """
         cache = self._item_cache.get(item_id)
-        if cache and cache["timestamp"] > since:
+        if cache and cache.timestamp > since:
             return True
         return False
 
@@ -348,9 +414,13 @@ class UniversalisWebSocket:
         current_time = time.time()
         status_list = []
 
+        with self._lock:
+            world_last_update = dict(self._world_last_update)
+            world_event_count = dict(self._world_event_count)
+
         for world_id, world_name in WORLDS.items():
-            last_update = self._world_last_update.get(world_id, 0)
-            event_count = self._world_event_count.get(world_id, 0)
+            last_update = world_last_update.get(world_id, 0)
+            event_count = world_event_count.get(world_id, 0)
 
             if last_update > 0:
                 elapsed = current_time - last_update
@@ -369,8 +439,9 @@ class UniversalisWebSocket:
 
     def reset_stats(self):
         """重置統計數據."""
-        self._world_last_update.clear()
-        self._world_event_count.clear()
+        with self._lock:
+            self._world_last_update.clear()
+            self._world_event_count.clear()
         with self._live_events_lock:
             self._live_events.clear()
 